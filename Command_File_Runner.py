@@ -0,0 +1,238 @@
+#
+#	Command file runner for the Keysight E36312A (SCPI) and the Keithley DMM6500 (TSP)
+#
+#   A command file is plain text, one instrument command per line. Besides
+#   ordinary commands the following lines are understood:
+#
+#       # comment                   Ignored, as are blank lines
+#       @SET name = value           Define a variable
+#       @GET name = <query>         Send a query and store its response in a variable
+#       @WAIT seconds               Pause; also ends the current batch
+#
+#   Variables are substituted anywhere in a line as ${name}. Queries are any
+#   SCPI line with a '?' in a command header (not inside a quoted string) or
+#   any TSP line calling print(). Their responses are collected, in file
+#   order, in the returned RunResult. Lua '--' comments are stripped from TSP
+#   lines before they are pipelined.
+#
+#   Consecutive writes are pipelined into a single message (joined with ';:'
+#   for SCPI, ' ' for TSP), so a block of setup commands costs one write.
+#   Queries are always sent on their own: an error in a pipelined write makes
+#   the instrument drop the rest of its message, and a query riding along
+#   would never be answered. The error queue is checked once at the end of
+#   every batch rather than after every line, and whenever a query gets no
+#   response.
+#
+
+import re
+import time
+from enum import Enum
+
+VAR_PATTERN = re.compile(r"\$\{(\w+)\}")
+QUOTED_PATTERN = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'")
+TSP_QUOTED_PATTERN = re.compile(QUOTED_PATTERN.pattern + r"|\[(?P<level>=*)\[.*?\](?P=level)\]")    # Adds Lua [[long strings]]
+TSP_COMMENT_PATTERN = re.compile(r"(" + TSP_QUOTED_PATTERN.pattern + r")|--")
+MAX_MESSAGE_LEN = 512     # Keep pipelined messages well below the instrument input buffer
+
+
+class Language(Enum):
+    SCPI = 0
+    TSP = 1
+
+
+class CommandFileError(Exception):
+    def __init__(self, lineNum, msg):
+        if lineNum is not None:
+            msg = "line {}: {}".format(lineNum, msg)
+        super().__init__(msg)
+        self.lineNum = lineNum
+
+
+class RunResult:
+    def __init__(self):
+        self.responses = []     # (lineNum, command, response) for every query, in file order
+        self.variables = {}     # Final variable values, including @GET results
+        self.errors = []        # (batchNum, error string) reported by the instrument
+        self.messages = 0       # Number of writes/queries actually sent
+
+    def Response(self, command):
+        # Returns the response of the first query whose command matches
+        for lineNum, cmd, resp in self.responses:
+            if cmd == command:
+                return resp
+        return None
+
+
+# ======================================================================
+#      DEFINE THE COMMAND FILE RUNNER HERE
+# ======================================================================
+class CommandFileRunner:
+    def __init__(self, instr, language=Language.SCPI):
+        # instr is an open pyvisa resource (or anything with write() and query())
+        self.instr = instr
+        self.language = language
+        self.echoCmd = 0
+        self.stopOnError = 1
+
+    def RunFile(self, filePathAndName, variables=None):
+        cmd_file = open(filePathAndName, "r")
+        contents = cmd_file.read()
+        cmd_file.close()
+        return self.Run(contents.split('\n'), variables)
+
+    def Run(self, lines, variables=None):
+        result = RunResult()
+        if variables is not None:
+            result.variables.update(variables)
+
+        pending = []        # Writes waiting to be pipelined
+        batchNum = 0
+        for lineNum, line in enumerate(lines, 1):
+            line = line.strip()
+            if (not line) or line.startswith("#"):
+                continue
+            line = self._Substitute(lineNum, line, result.variables)
+            if self.language == Language.TSP:
+                line = self._StripComment(lineNum, line)
+                if not line:
+                    continue
+
+            if line[0] == "@":
+                directive, _, arg = line[1:].partition(" ")
+                directive = directive.upper()
+                if directive == "SET":
+                    name, value = self._SplitAssign(lineNum, arg)
+                    result.variables[name] = value
+                elif directive == "GET":
+                    name, query = self._SplitAssign(lineNum, arg)
+                    resp = self._Query(pending, query, result, lineNum, batchNum)
+                    result.responses.append((lineNum, query, resp))
+                    result.variables[name] = resp
+                elif directive == "WAIT":
+                    try:
+                        seconds = float(arg)
+                    except ValueError:
+                        raise CommandFileError(lineNum, "bad wait time '{}'".format(arg))
+                    self._Flush(pending, result)
+                    self._CheckErrors(batchNum, result)
+                    batchNum += 1
+                    time.sleep(seconds)
+                else:
+                    raise CommandFileError(lineNum, "unknown directive '@{}'".format(directive))
+            elif self._IsQuery(line):
+                resp = self._Query(pending, line, result, lineNum, batchNum)
+                result.responses.append((lineNum, line, resp))
+            else:
+                if self._PendingLen(pending) + len(line) > MAX_MESSAGE_LEN:
+                    self._Flush(pending, result)
+                pending.append(line)
+
+        self._Flush(pending, result)
+        self._CheckErrors(batchNum, result)
+        return result
+
+    # ======================================================================
+    #      DEFINE HELPER FUNCTIONS HERE
+    # ======================================================================
+    def _Substitute(self, lineNum, line, variables):
+        def lookup(match):
+            if match.group(1) not in variables:
+                raise CommandFileError(lineNum, "undefined variable '{}'".format(match.group(1)))
+            return str(variables[match.group(1)])
+        return VAR_PATTERN.sub(lookup, line)
+
+    def _SplitAssign(self, lineNum, arg):
+        name, sep, value = arg.partition("=")
+        name = name.strip()
+        if (not sep) or (not name.isidentifier()):
+            raise CommandFileError(lineNum, "expected 'name = value', got '{}'".format(arg))
+        return name, value.strip()
+
+    def _StripComment(self, lineNum, line):
+        # Everything after a Lua '--' outside a string is a comment; left in, it
+        # would comment out every command pipelined after this line
+        for match in TSP_COMMENT_PATTERN.finditer(line):
+            if match.group(1) is None:
+                if line.startswith("--[[", match.start()) and "]]" not in line[match.start():]:
+                    raise CommandFileError(lineNum, "multi-line Lua comments are not supported")
+                return line[:match.start()].rstrip()
+        return line
+
+    def _IsQuery(self, line):
+        if self.language == Language.SCPI:
+            # Only a '?' in a command header makes a query, not one in a string argument
+            for cmd in QUOTED_PATTERN.sub('""', line).split(";"):
+                header = cmd.split(None, 1)
+                if header and header[0].endswith("?"):
+                    return True
+            return False
+        # print() inside a string argument, e.g. display.settext(..., "print(x)"), is not a query
+        line = TSP_QUOTED_PATTERN.sub('""', line)
+        return "print(" in line or "printbuffer(" in line
+
+    def _Join(self, cmds):
+        if self.language == Language.SCPI:
+            # A leading ':' resets the SCPI header path; common (*) commands don't need it
+            return ";".join(c if c[0] in "*:" or i == 0 else ":" + c for i, c in enumerate(cmds))
+        return " ".join(cmds)
+
+    def _PendingLen(self, pending):
+        return sum(len(c) + 2 for c in pending)
+
+    def _Send(self, msg, result):
+        if self.echoCmd == 1:
+            print(msg)
+        result.messages += 1
+        self.instr.write(msg)
+
+    def _Flush(self, pending, result):
+        if pending:
+            self._Send(self._Join(pending), result)
+            del pending[:]
+
+    def _Query(self, pending, query, result, lineNum, batchNum):
+        self._Flush(pending, result)
+        if self.echoCmd == 1:
+            print(query)
+        result.messages += 1
+        try:
+            return self.instr.query(query).strip()
+        except Exception as err:
+            # No response usually means the instrument rejected the command;
+            # report what its error queue says rather than a bare timeout
+            try:
+                errors = self._DrainErrors(result)
+            except Exception:
+                raise err
+            if not errors:
+                raise
+            result.errors += [(batchNum, e) for e in errors]
+            raise CommandFileError(lineNum, "no response to '{}', instrument reported: {}".format(
+                query, "; ".join(errors))) from err
+
+    def _ReadError(self, result):
+        # Returns the next error string, or None when the queue is empty
+        result.messages += 1
+        if self.language == Language.SCPI:
+            resp = self.instr.query("SYSTem:ERRor?").strip()
+            code = resp.split(",", 1)[0]
+            return None if int(code) == 0 else resp
+        resp = self.instr.query("if errorqueue.count > 0 then print(errorqueue.next()) else print(0) end").strip()
+        return None if resp in ("0", "0.0", "0.000000000e+00") else resp
+
+    def _DrainErrors(self, result):
+        errors = []
+        err = self._ReadError(result)
+        while err is not None:      # Drain the queue only when something went wrong
+            errors.append(err)
+            err = self._ReadError(result)
+        return errors
+
+    def _CheckErrors(self, batchNum, result):
+        errors = self._DrainErrors(result)
+        if not errors:
+            return
+        result.errors += [(batchNum, e) for e in errors]
+        if self.stopOnError == 1:
+            raise CommandFileError(None, "instrument reported error(s) in batch {}: {}".format(
+                batchNum, "; ".join(errors)))
@@ -0,0 +1,55 @@
+#
+#	Cold-start import benchmark
+#
+#   Imports every module in a fresh interpreter (several times, best run is
+#   kept) and checks that it takes less than IMPORT_BUDGET seconds, does not
+#   pull in pyvisa and opens no instrument. Exits non-zero on failure.
+#
+#       python Import_Benchmark.py
+#
+
+import os
+import subprocess
+import sys
+
+IMPORT_BUDGET = 0.100
+REPEATS = 5
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODULES = ["Keithley_DMM6500_VISA_Driver.py",
+           "Keithley_DMM6500_Trigger_Model.py",
+           "Command_File_Runner.py",
+           "Sweep_Plan.py",
+           os.path.join("KEYSIGHT_E36312A", "psu_control.py"),
+           os.path.join("KEYSIGHT_E36312A", "Step_PSU_Control.py"),]
+
+# Runs in the child interpreter; prints "<seconds> <pyvisa imported>"
+CHILD = """
+import importlib.util, sys, time
+t0 = time.perf_counter()
+spec = importlib.util.spec_from_file_location("bench_target", sys.argv[1])
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+print(time.perf_counter() - t0, "pyvisa" in sys.modules)
+"""
+
+def TimeImport(path):
+    best = None
+    for i in range(REPEATS):
+        out = subprocess.run([sys.executable, "-c", CHILD, path], cwd=HERE,
+                             capture_output=True, text=True, check=True).stdout.split()
+        seconds, pyvisaLoaded = float(out[0]), out[1] == "True"
+        best = seconds if best is None else min(best, seconds)
+    return best, pyvisaLoaded
+
+def main():
+    failed = 0
+    for module in MODULES:
+        seconds, pyvisaLoaded = TimeImport(os.path.join(HERE, module))
+        ok = (seconds < IMPORT_BUDGET) and not pyvisaLoaded
+        failed += not ok
+        print("{:<45} {:7.1f} ms {}{}".format(module, seconds * 1000, "ok" if ok else "FAIL",
+                                             " (imported pyvisa)" if pyvisaLoaded else ""))
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
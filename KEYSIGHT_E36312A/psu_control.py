@@ -1,22 +1,33 @@
-import pyvisa
-rm = pyvisa.ResourceManager()
-rm.list_resources()
+import os, sys
 
-inst = rm.open_resource('USB0::0x2A8D::0x1102::MY58270541::INSTR')  #Define variable? Test Equipment named inst
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from Command_File_Runner import CommandFileRunner, Language
 
-#inst.baud_rate = 57600
+RESOURCE = 'USB0::0x2A8D::0x1102::MY58270541::INSTR'
+COMMAND_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ON_PSU.txt")
 
-inst.read_termination = '\n'
-inst.write_termination = '\n'
-inst.query('*IDN?')
+def main():
+    import pyvisa       # Imported here so importing this script does no I/O
+    rm = pyvisa.ResourceManager()
+    rm.list_resources()
 
-command_list  = open("ON_PSU.txt", "r").read().split('\n')
+    inst = rm.open_resource(RESOURCE)  #Define variable? Test Equipment named inst
 
-for command in command_list:
-    print(command)
+    #inst.baud_rate = 57600
 
-#print(inst.query("*IDN?"))
-#print(inst.query("SYSTem:ERRor?"))
+    inst.read_termination = '\n'
+    inst.write_termination = '\n'
+
+        #Writes are pipelined, SYSTem:ERRor? is checked once per batch
+    runner = CommandFileRunner(inst, Language.SCPI)
+    runner.echoCmd = 1
+    result = runner.RunFile(COMMAND_FILE)
+
+    for lineNum, command, response in result.responses:
+        print("{}: {} -> {}".format(lineNum, command, response))
+
+if __name__ == "__main__":
+    main()
 
 """
 Common SCPI Commands
@@ -25,4 +36,4 @@ Reset - '*RST'
 Example Source 1 3.5V 1.5A
 
 inst.write('APPLy P6V,3.5,1.5')
-"""
\ No newline at end of file
+"""
@@ -0,0 +1,185 @@
+#
+#	Trigger-model builder for the Keithley DMM6500
+#
+#   Builds a trigger model block by block and compiles it into the TSP
+#   trigger.model.setblock() calls (plus timer and digital I/O setup) that
+#   DMM6500.SetTrigger_Model() sends to the instrument in one batch. Once
+#   loaded, the sequence is timed by the instrument, not by host sleeps.
+#
+#   Example, 100 readings 1 ms apart, started by a falling edge on digital
+#   I/O line 1 and signalling completion on line 2:
+#
+#       tm = TriggerModel()
+#       tm.DigitalInput(1, "FALLING")
+#       tm.DigitalOutput(2, NotifyEvent(1))
+#       tm.BufferClear()
+#       tm.Wait(DigioEvent(1))
+#       tm.Label("loop")
+#       tm.Measure("defbuffer1", 1)
+#       tm.Delay(0.001)
+#       tm.BranchCounter(100, "loop")
+#       tm.Notify(1)
+#       dmm.SetTrigger_Model(tm)
+#       dmm.Init()
+#
+#   For a hardware-timed rate, start a timer from a Notify block in the run:
+#
+#       tick = tm.Timer(1, 0.001, NotifyEvent(2), count=100)
+#       tm.Notify(2)
+#       tm.Label("loop")
+#       tm.Wait(tick)
+#       tm.Measure()
+#       tm.BranchCounter(100, "loop")
+#
+
+COUNT_INFINITE = "trigger.COUNT_INFINITE"
+COUNT_AUTO = "trigger.COUNT_AUTO"
+COUNT_STOP = "trigger.COUNT_STOP"
+
+
+# ======================================================================
+#      DEFINE TRIGGER EVENT NAMES HERE
+# ======================================================================
+def DigioEvent(line):
+    return "trigger.EVENT_DIGIO{}".format(line)
+
+def TimerEvent(timer):
+    return "trigger.EVENT_TIMER{}".format(timer)
+
+def NotifyEvent(notify):
+    return "trigger.EVENT_NOTIFY{}".format(notify)
+
+def BlockEvent(name):
+    # Other events by name, e.g. BlockEvent("DISPLAY") or BlockEvent("COMMAND")
+    return "trigger.EVENT_{}".format(name.upper())
+
+
+class TriggerModelError(Exception):
+    pass
+
+
+# ======================================================================
+#      DEFINE THE TRIGGER MODEL BUILDER HERE
+# ======================================================================
+class TriggerModel:
+    def __init__(self):
+        self.blocks = []        # (blockType, [params]); block N is self.blocks[N - 1]
+        self.labels = {}        # label -> block number
+        self.setup = []         # Timer and digital I/O configuration commands
+
+    def _Add(self, blockType, *params):
+        self.blocks.append((blockType, list(params)))
+        return len(self.blocks)
+
+    def Label(self, name):
+        # Names the next block so branches can refer to it, including forward branches
+        if name in self.labels:
+            raise TriggerModelError("Duplicate label '{}'".format(name))
+        self.labels[name] = len(self.blocks) + 1
+        return self.labels[name]
+
+    # ======================================================================
+    #      DEFINE BLOCKS HERE
+    # ======================================================================
+    def BufferClear(self, bufferName="defbuffer1"):
+        return self._Add("trigger.BLOCK_BUFFER_CLEAR", bufferName)
+
+    def Measure(self, bufferName="defbuffer1", count=1):
+        return self._Add("trigger.BLOCK_MEASURE_DIGITIZE", bufferName, count)
+
+    def Delay(self, seconds):
+        if seconds < 0:
+            raise TriggerModelError("Delay must be >= 0")
+        return self._Add("trigger.BLOCK_DELAY_CONSTANT", seconds)
+
+    def Wait(self, *events, clear=False, logic="AND"):
+        # Waits for up to three events; clear=True discards events seen before the block is entered
+        if not 1 <= len(events) <= 3:
+            raise TriggerModelError("Wait block takes 1 to 3 events")
+        params = [events[0], "trigger.CLEAR_ENTER" if clear else "trigger.CLEAR_NEVER",
+                  "trigger.WAIT_{}".format(logic.upper())] + list(events[1:])
+        return self._Add("trigger.BLOCK_WAIT", *params)
+
+    def Notify(self, notify):
+        return self._Add("trigger.BLOCK_NOTIFY", NotifyEvent(notify))
+
+    def DigitalIO(self, bitPattern, bitMask):
+        return self._Add("trigger.BLOCK_DIGITAL_IO", bitPattern, bitMask)
+
+    def BranchAlways(self, target):
+        return self._Add("trigger.BLOCK_BRANCH_ALWAYS", _Target(target))
+
+    def BranchCounter(self, count, target):
+        # Branches to target until it has done so count times, then falls through
+        if count < 1:
+            raise TriggerModelError("Branch count must be >= 1")
+        return self._Add("trigger.BLOCK_BRANCH_COUNTER", count, _Target(target))
+
+    def BranchOnEvent(self, event, target):
+        return self._Add("trigger.BLOCK_BRANCH_ON_EVENT", event, _Target(target))
+
+    def ResetBranchCount(self, counterBlock):
+        return self._Add("trigger.BLOCK_RESET_BRANCH_COUNT", _Target(counterBlock))
+
+    # ======================================================================
+    #      DEFINE TIMER AND DIGITAL I/O SETUP HERE
+    # ======================================================================
+    def Timer(self, timer, delay, stimulus, count=1):
+        # Timer fires count times, delay seconds apart, once stimulus occurs. The
+        # timer is enabled when the model is loaded, so the stimulus must come
+        # from the run itself, e.g. a Notify(n) block with stimulus NotifyEvent(n);
+        # a timer without one would start counting before Init().
+        if (not stimulus) or (stimulus == "trigger.EVENT_NONE"):
+            raise TriggerModelError("Timer {} needs a start stimulus".format(timer))
+        pre = "trigger.timer[{}]".format(timer)
+        self.setup += ["{}.clear()".format(pre),
+                       "{}.delay = {}".format(pre, delay),
+                       "{}.count = {}".format(pre, count),
+                       "{}.start.stimulus = {}".format(pre, stimulus),
+                       "{}.start.generate = trigger.OFF".format(pre),
+                       "{}.enable = trigger.ON".format(pre)]
+        return TimerEvent(timer)
+
+    def DigitalInput(self, line, edge="FALLING"):
+        self.setup += ["digio.line[{}].mode = digio.MODE_TRIGGER_IN".format(line),
+                       "trigger.digin[{}].clear()".format(line),
+                       "trigger.digin[{}].edge = trigger.EDGE_{}".format(line, edge.upper())]
+        return DigioEvent(line)
+
+    def DigitalOutput(self, line, stimulus, logic="NEGATIVE", pulseWidth=10e-6):
+        self.setup += ["digio.line[{}].mode = digio.MODE_TRIGGER_OUT".format(line),
+                       "trigger.digout[{}].logic = trigger.LOGIC_{}".format(line, logic.upper()),
+                       "trigger.digout[{}].pulsewidth = {}".format(line, pulseWidth),
+                       "trigger.digout[{}].stimulus = {}".format(line, stimulus)]
+
+    # ======================================================================
+    #      DEFINE COMPILER HERE
+    # ======================================================================
+    def Compile(self):
+        # Returns the TSP commands that load this model, in order
+        if not self.blocks:
+            raise TriggerModelError("Trigger model has no blocks")
+        cmds = ["trigger.model.load(\"Empty\")"] + self.setup
+        for blockNum, (blockType, params) in enumerate(self.blocks, 1):
+            args = [str(blockNum), blockType]
+            for param in params:
+                if isinstance(param, _Target):      # Buffer names are TSP variables, passed unquoted
+                    param = self._Resolve(param.target, blockNum)
+                args.append(str(param))
+            cmds.append("trigger.model.setblock({})".format(", ".join(args)))
+        return cmds
+
+    def _Resolve(self, target, blockNum):
+        if isinstance(target, str):
+            if target not in self.labels:
+                raise TriggerModelError("Block {} branches to unknown label '{}'".format(blockNum, target))
+            target = self.labels[target]
+        if not 1 <= target <= len(self.blocks):
+            raise TriggerModelError("Block {} branches to missing block {}".format(blockNum, target))
+        return target
+
+
+class _Target:
+    # Marks a block parameter as a branch target (block number or label)
+    def __init__(self, target):
+        self.target = target
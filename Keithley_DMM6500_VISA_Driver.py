@@ -4,12 +4,99 @@
 #	November 23, 2022
 #
 
-import pyvisa as visa
-import struct
-import math
+import os
+import sys
 import time
 from enum import Enum
 
+# pyvisa is imported on first connect, not here, so importing this module stays
+# cheap for tooling and test collection. Use ResourceManager() below instead of
+# importing pyvisa yourself if you want the same behaviour.
+_rsrcMgr = None
+
+def ResourceManager():
+    global _rsrcMgr
+    if _rsrcMgr is None:
+        import pyvisa
+        _rsrcMgr = pyvisa.ResourceManager()
+    return _rsrcMgr
+
+def __getattr__(name):
+    # Scripts written against the old module still find pyvisa as 'visa'
+    if name == "visa":
+        import pyvisa
+        return pyvisa
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+def _IsTransient(err):
+    # Timeouts and VISA I/O errors are worth a retry; anything else is a real bug.
+    # pyvisa is looked up rather than imported so this never triggers the import.
+    if isinstance(err, (TimeoutError, ConnectionError)):
+        return True
+    pyvisa = sys.modules.get("pyvisa")
+    return (pyvisa is not None) and isinstance(err, pyvisa.errors.VisaIOError)
+
+# ======================================================================
+#      DEFINE THE SCAN CHECKPOINT HERE
+# ======================================================================
+class ScanCheckpoint:
+    # Records which reading ranges of a buffer download have been confirmed, so
+    # an interrupted GetScan_Data() resumes where it stopped instead of starting
+    # over. With a file path the checkpoint also survives the Python process.
+    # acquisition identifies the scan (timestamp of its first reading), so a
+    # checkpoint is never resumed against a later scan over the same range.
+    def __init__(self, startIndex, endIndex, acquisition, filePathAndName=None):
+        self.startIndex = startIndex
+        self.endIndex = endIndex
+        self.acquisition = acquisition
+        self.filePathAndName = filePathAndName
+        self.chunks = []        # [first, last, data] in download order
+
+    def Matches(self, startIndex, endIndex, acquisition):
+        return (self.startIndex, self.endIndex, self.acquisition) == (startIndex, endIndex, acquisition)
+
+    def NextIndex(self):
+        if not self.chunks:
+            return self.startIndex
+        return self.chunks[-1][1] + 1
+
+    def Done(self):
+        return self.NextIndex() > self.endIndex
+
+    def Add(self, first, last, data):
+        self.chunks.append([first, last, data])
+        if self.filePathAndName is not None:
+            self.Save()
+
+    def Data(self):
+        return ", ".join(c[2] for c in self.chunks)
+
+    def Save(self):
+        import json
+        tmpName = self.filePathAndName + ".tmp"
+        tmp_file = open(tmpName, "w")
+        json.dump({"startIndex": self.startIndex, "endIndex": self.endIndex,
+                   "acquisition": self.acquisition, "chunks": self.chunks}, tmp_file)
+        tmp_file.close()
+        os.replace(tmpName, self.filePathAndName)     # Never leave a half written checkpoint
+
+    def Delete(self):
+        if (self.filePathAndName is not None) and os.path.exists(self.filePathAndName):
+            os.remove(self.filePathAndName)
+
+    @classmethod
+    def Load(cls, filePathAndName, startIndex, endIndex, acquisition):
+        # Returns the saved checkpoint if it is for the same scan, otherwise a fresh one
+        import json
+        checkpoint = cls(startIndex, endIndex, acquisition, filePathAndName)
+        if os.path.exists(filePathAndName):
+            chk_file = open(filePathAndName, "r")
+            saved = json.load(chk_file)
+            chk_file.close()
+            if checkpoint.Matches(saved["startIndex"], saved["endIndex"], saved.get("acquisition")):
+                checkpoint.chunks = saved["chunks"]
+        return checkpoint
+
 # ======================================================================
 #      DEFINE THE DMM CLASS INSTANCE HERE
 # ======================================================================
@@ -17,6 +104,10 @@ class DMM6500:
     def __init__(self):
         self.echoCmd = 1
         self.myInstr = 0
+        self.queryRetries = 3       # Extra attempts for idempotent queries after a timeout/I/O error
+        self.retryDelay = 0.05      # Seconds, multiplied by the attempt number
+        self.scanChunkSize = 1000   # Readings per printbuffer() query in GetScan_Data
+        self.scanCheckpoint = None
         self.measurement_functions = ["dmm.FUNC_DC_VOLTAGE",
                              "dmm.FUNC_DC_CURRENT",
                              "dmm.FUNC_AC_VOLTAGE",
@@ -28,9 +119,11 @@ class DMM6500:
     #      DEFINE INSTRUMENT CONNECTION AND COMMUNICATIONS FUNCTIONS HERE
     # ======================================================================
     def Connect(self, rsrcMgr, rsrcString, timeout, doIdQuery, doReset, doClear):
+        if rsrcMgr is None:
+            rsrcMgr = ResourceManager()
         self.myInstr = rsrcMgr.open_resource(rsrcString)
         if doIdQuery == 1:
-            print(self.QueryCmd("*IDN?"))
+            print(self.QueryCmd("*IDN?", idempotent=True))
         if doReset == 1:
             self.SendCmd("reset()")
         if doClear == 1:
@@ -48,10 +141,36 @@ class DMM6500:
         self.myInstr.write(cmd)
         return
 
-    def QueryCmd(self, cmd):
+    def QueryCmd(self, cmd, idempotent=False):
+        # Only queries marked idempotent (reading state or buffers) are retried
+        # after a device clear; anything else is only ever sent once. A late
+        # reply is always cleared before giving up, so it can't be read as the
+        # answer to the next query.
         if self.echoCmd == 1:
             print(cmd)
-        return self.myInstr.query(cmd)
+        attempt = 0
+        while True:
+            try:
+                return self.myInstr.query(cmd)
+            except Exception as err:
+                if not _IsTransient(err):
+                    raise
+                if (not idempotent) or (attempt >= self.queryRetries):
+                    self.Recover()
+                    raise
+                attempt += 1
+                print("Query \"{}\" failed ({}), retry {} of {}".format(cmd, err, attempt, self.queryRetries))
+                self.Recover()
+                time.sleep(self.retryDelay * attempt)
+
+    def Recover(self):
+        # Device clear aborts the pending query and flushes the I/O buffers so the
+        # next query's response can't be mixed up with a stale one.
+        try:
+            self.myInstr.clear()
+        except Exception as err:
+            if not _IsTransient(err):
+                raise
 
     # ======================================================================
     #      DEFINE BASIC FUNCTIONS HERE
@@ -62,7 +181,7 @@ class DMM6500:
 
     def IDQuery(self):
         sndBuffer = "*IDN?"
-        return self.QueryCmd(sndBuffer)
+        return self.QueryCmd(sndBuffer, idempotent=True)
 
     def LoadScriptFile(self, filePathAndName):
         # This function opens the functions.lua file in the same directory as
@@ -640,14 +759,50 @@ class DMM6500:
         return
 
     def GetScan_Status(self):
-        return self.QueryCmd("print(trigger.model.state())")
+        return self.QueryCmd("print(trigger.model.state())", idempotent=True)
+
+    def SetTrigger_Model(self, model, maxLen=2048):
+        # Loads a TriggerModel (see Keithley_DMM6500_Trigger_Model.py). The compiled
+        # commands are space-joined into as few messages as possible, each below
+        # maxLen characters; start the model with Init().
+        batch = ""
+        for cmd in model.Compile():
+            if batch and len(batch) + len(cmd) + 1 > maxLen:
+                self.SendCmd(batch)
+                batch = ""
+            batch = "{} {}".format(batch, cmd) if batch else cmd
+        self.SendCmd(batch)
+        return
 
-    def GetScan_Data(self, dataCount, startIndex, endIndex):                    ## NOT USED 3/21/23
+    def GetScan_Data(self, dataCount, startIndex, endIndex, checkpointFile=None):  ## NOT USED 3/21/23
+        # Downloads in chunks of scanChunkSize readings and checkpoints every
+        # confirmed chunk. If a chunk still fails after the query retries the
+        # error is raised, and calling GetScan_Data again for the same scan
+        # resumes from the last confirmed index. The checkpoint (and its file)
+        # is discarded once the download is complete.
         #charCnt = 24 * dataCount
-        accumCnt = int(self.QueryCmd("print(defbuffer1.n)")[0:-1])
+        accumCnt = int(self.QueryCmd("print(defbuffer1.n)", idempotent=True)[0:-1])
         while(accumCnt < endIndex):
-            accumCnt = int(self.QueryCmd("print(defbuffer1.n)")[0:-1])
-        rcvBuffer = self.QueryCmd("printbuffer({}, {}, defbuffer1)".format(startIndex, endIndex))[0:-1]
+            accumCnt = int(self.QueryCmd("print(defbuffer1.n)", idempotent=True)[0:-1])
+        acquisition = self.QueryCmd("print(defbuffer1.seconds[{0}], defbuffer1.fractionalseconds[{0}])".format(startIndex),
+                                    idempotent=True).strip()
+
+        checkpoint = self.scanCheckpoint
+        if (checkpoint is None) or not checkpoint.Matches(startIndex, endIndex, acquisition):
+            if checkpointFile is not None:
+                checkpoint = ScanCheckpoint.Load(checkpointFile, startIndex, endIndex, acquisition)
+            else:
+                checkpoint = ScanCheckpoint(startIndex, endIndex, acquisition)
+            self.scanCheckpoint = checkpoint
+
+        while not checkpoint.Done():
+            first = checkpoint.NextIndex()
+            last = min(first + self.scanChunkSize - 1, endIndex)
+            rcvBuffer = self.QueryCmd("printbuffer({}, {}, defbuffer1)".format(first, last), idempotent=True)[0:-1]
+            checkpoint.Add(first, last, rcvBuffer)
+        rcvBuffer = checkpoint.Data()
+        checkpoint.Delete()
+        self.scanCheckpoint = None
         return rcvBuffer
 
 #################################################################################
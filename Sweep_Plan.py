@@ -0,0 +1,166 @@
+#
+#	Precomputed sweep plans for stepping supply outputs (e.g. Keysight E36312A)
+#
+#   Every setpoint is computed directly from its index, never by accumulating
+#   a float step, so a plan cannot drift, skip or duplicate points. A plan is
+#   compiled once into a CompiledPlan holding the full setpoint table, the
+#   per-step channel changes and the per-step base dwell. Running a plan never
+#   changes its setpoints or base dwells, so it can be run again and again (one
+#   DUT after another) without being regenerated.
+#
+#   Example, P6V from 0 V to 4.5 V in 10 steps, P25V at 1 V and 2 V:
+#
+#       plan = SweepPlan()
+#       plan.AddAxis("P25V", ListSteps([1, 2]), dwell=1.0)
+#       plan.AddAxis("P6V", LinearSteps(0, 4.5, 10), dwell=0.5)
+#       compiled = plan.Compile()
+#       print(compiled.EstimateRuntime())
+#       compiled.Run(lambda ch, v: inst.write("APPLy {},{},.1".format(ch, v)))
+#
+#   To schedule dwell from measured settling, run once with a measureFn and
+#   tolerance, then pass compiled.ScheduleDwells() as dwells to later runs.
+#   A step has settled once every channel it wrote reads within tolerance of
+#   its new setpoint for settlePolls polls in a row. Re-measure for a DUT that
+#   may settle differently.
+#
+
+import math
+import time
+
+SETTLE_TIMEOUT = 5.0      # Seconds a step may take to settle before it is reported as unsettled
+
+
+# ======================================================================
+#      DEFINE SETPOINT GENERATORS HERE
+# ======================================================================
+def _Quantize(values, resolution):
+    if resolution is None:
+        return tuple(values)
+    digits = max(0, -int(math.floor(math.log10(resolution))))
+    points = tuple(round(round(v / resolution) * resolution, digits) for v in values)
+    if len(set(points)) != len(points):
+        raise ValueError("Resolution {} is too coarse for the requested steps".format(resolution))
+    return points
+
+def LinearSteps(start, stop, steps, resolution=0.001):
+    # steps + 1 points from start to stop inclusive
+    if steps < 1:
+        raise ValueError("Number of steps must be >= 1")
+    span = stop - start
+    return _Quantize([start + span * i / steps for i in range(steps)] + [stop], resolution)
+
+def LogSteps(start, stop, steps, resolution=None):
+    # steps + 1 logarithmically spaced points from start to stop inclusive
+    if steps < 1:
+        raise ValueError("Number of steps must be >= 1")
+    if (start <= 0) or (stop <= 0):
+        raise ValueError("Logarithmic sweeps need start and stop > 0")
+    ratio = stop / start
+    return _Quantize([start * ratio ** (i / steps) for i in range(steps)] + [stop], resolution)
+
+def ListSteps(values, resolution=None):
+    if not values:
+        raise ValueError("List sweep needs at least one value")
+    return _Quantize(values, resolution)
+
+
+# ======================================================================
+#      DEFINE THE SWEEP PLAN HERE
+# ======================================================================
+class SweepPlan:
+    def __init__(self):
+        self.axes = []      # (channel, setpoints, dwell); first axis is the outermost loop
+
+    def AddAxis(self, channel, setpoints, dwell=0.5):
+        self.axes.append((channel, tuple(setpoints), dwell))
+        return self
+
+    def Compile(self):
+        if not self.axes:
+            raise ValueError("Sweep plan has no axes")
+        channels = tuple(a[0] for a in self.axes)
+        points = [()]
+        for channel, setpoints, dwell in self.axes:
+            points = [p + (v,) for p in points for v in setpoints]
+
+        changes = []
+        dwells = []
+        previous = None
+        for point in points:
+            # Only the channels whose value changed need to be written
+            changed = tuple(i for i in range(len(channels))
+                            if previous is None or point[i] != previous[i])
+            changes.append(tuple((channels[i], point[i]) for i in changed))
+            dwells.append(max(self.axes[i][2] for i in changed))
+            previous = point
+        return CompiledPlan(channels, tuple(points), tuple(changes), tuple(dwells))
+
+
+class CompiledPlan:
+    def __init__(self, channels, points, changes, dwells):
+        self.channels = channels
+        self.points = points            # Full setpoint tuple for every step
+        self.changes = changes          # (channel, value) pairs to write at every step
+        self.dwells = dwells            # Base seconds to wait after every step
+        self.settleTimes = [None] * len(points)     # Measured by the last settling Run()
+        self.unsettled = []             # Steps that did not settle in the last settling Run()
+
+    def __len__(self):
+        return len(self.points)
+
+    def EstimateRuntime(self, cmdOverhead=0.0, dwells=None):
+        # cmdOverhead is the time taken by one channel write, if known
+        if dwells is None:
+            dwells = self.dwells
+        writes = sum(len(c) for c in self.changes)
+        return sum(dwells) + writes * cmdOverhead
+
+    def ScheduleDwells(self, margin=1.2, minimum=0.0):
+        # Returns a new dwell schedule from the last run's settling times; steps
+        # that were not measured or did not settle keep their base dwell
+        return tuple(self.dwells[i] if (settle is None) or (i in self.unsettled)
+                     else max(minimum, settle * margin)
+                     for i, settle in enumerate(self.settleTimes))
+
+    def Run(self, applyFn, measureFn=None, tolerance=None, dwells=None,
+            settleTimeout=SETTLE_TIMEOUT, pollInterval=0.01, settlePolls=3):
+        # applyFn(channel, value) writes one setpoint and measureFn(channel) reads
+        # one channel back. Each step waits dwells[i] (the base dwells unless a
+        # schedule is given). If measureFn and tolerance are given, each step
+        # instead waits until the channels it wrote have read within tolerance of
+        # their setpoints for settlePolls polls in a row, up to settleTimeout; the
+        # settling times are kept in settleTimes and the steps that timed out in
+        # unsettled. Results are (point, readings) with a reading per channel.
+        if dwells is None:
+            dwells = self.dwells
+        settling = (measureFn is not None) and (tolerance is not None)
+        if settling:
+            self.settleTimes = [None] * len(self.points)
+            self.unsettled = []
+        results = []
+        for i, point in enumerate(self.points):
+            for channel, value in self.changes[i]:
+                applyFn(channel, value)
+            t0 = time.perf_counter()
+            if settling:
+                inBand = 0
+                while True:
+                    time.sleep(pollInterval)
+                    settled = all(abs(measureFn(channel) - value) <= tolerance
+                                  for channel, value in self.changes[i])
+                    inBand = inBand + 1 if settled else 0
+                    elapsed = time.perf_counter() - t0
+                    if inBand >= settlePolls:
+                        self.settleTimes[i] = elapsed
+                        break
+                    if elapsed >= settleTimeout:
+                        self.settleTimes[i] = elapsed
+                        self.unsettled.append(i)
+                        break
+            else:
+                time.sleep(dwells[i])
+            readings = tuple(measureFn(ch) for ch in self.channels) if measureFn is not None else None
+            results.append((point, readings))
+        if settling and self.unsettled:
+            print("Steps {} did not settle within {} s".format(self.unsettled, settleTimeout))
+        return results
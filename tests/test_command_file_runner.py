@@ -0,0 +1,106 @@
+import pytest
+
+from Command_File_Runner import CommandFileRunner, CommandFileError, Language
+
+
+class FakeInstr:
+    # Records every message; queries answer "resp" unless an error is queued.
+    # A message containing "BAD" is rejected: it queues an error and a query in
+    # it times out, as a SCPI instrument drops the rest of a bad message.
+    def __init__(self, errors=()):
+        self.log = []
+        self.errors = list(errors)
+
+    def write(self, msg):
+        self.log.append(("write", msg))
+        if "BAD" in msg:
+            self.errors.append('-113,"Undefined header"\n')
+
+    def query(self, msg):
+        self.log.append(("query", msg))
+        if msg == "SYSTem:ERRor?":
+            return self.errors.pop(0) if self.errors else '+0,"No error"\n'
+        if msg.startswith("if errorqueue.count"):
+            return self.errors.pop(0) if self.errors else "0\n"
+        if "BAD" in msg:
+            self.errors.append('-113,"Undefined header"\n')
+            raise TimeoutError("VI_ERROR_TMO")
+        return "resp\n"
+
+
+def test_scpi_writes_are_pipelined_and_queries_sent_alone():
+    instr = FakeInstr()
+    result = CommandFileRunner(instr).Run(["*RST", "APPLy P6V,3.5,1.5", "OUTP ON", "*IDN?"])
+    assert instr.log == [("write", "*RST;:APPLy P6V,3.5,1.5;:OUTP ON"),
+                         ("query", "*IDN?"),
+                         ("query", "SYSTem:ERRor?")]
+    assert result.responses == [(4, "*IDN?", "resp")]
+    assert result.messages == 3
+
+
+def test_bad_write_before_query_is_reported_not_a_timeout():
+    instr = FakeInstr()
+    runner = CommandFileRunner(instr)
+    runner.stopOnError = 0
+    result = runner.Run(["BAD 1", "VOLT 2", "*IDN?"])
+    assert result.responses == [(3, "*IDN?", "resp")]
+    assert result.errors == [(0, '-113,"Undefined header"')]
+
+
+def test_query_without_response_raises_instrument_error():
+    with pytest.raises(CommandFileError, match=r"line 2: no response to 'BAD\?'.*Undefined header"):
+        CommandFileRunner(FakeInstr()).Run(["VOLT 1", "BAD?"])
+
+
+def test_variables_get_and_wait_batches():
+    instr = FakeInstr()
+    result = CommandFileRunner(instr).Run(["@SET v = 2.5", "VOLT ${v}", "@GET idn = *IDN?",
+                                           "@WAIT 0", "CURR 1"])
+    assert result.variables == {"v": "2.5", "idn": "resp"}
+    # One error check per batch: before the @WAIT and at the end
+    assert [m for m in instr.log if m[1] == "SYSTem:ERRor?"] == [("query", "SYSTem:ERRor?")] * 2
+    assert ("write", "CURR 1") in instr.log
+
+
+def test_question_mark_in_string_is_not_a_query():
+    instr = FakeInstr()
+    result = CommandFileRunner(instr).Run(['DISP:TEXT "Ready?"', "VOLT 1;MEAS:VOLT?"])
+    assert instr.log[:2] == [("write", 'DISP:TEXT "Ready?"'), ("query", "VOLT 1;MEAS:VOLT?")]
+    assert len(result.responses) == 1
+
+
+def test_instrument_errors_are_drained_and_raised():
+    runner = CommandFileRunner(FakeInstr())
+    with pytest.raises(CommandFileError, match="Undefined header"):
+        runner.Run(["BAD"])
+
+    runner.instr = FakeInstr()
+    runner.stopOnError = 0
+    assert runner.Run(["BAD"]).errors == [(0, '-113,"Undefined header"')]
+
+
+def test_tsp_comments_do_not_swallow_pipelined_commands():
+    instr = FakeInstr()
+    CommandFileRunner(instr, Language.TSP).Run(["dmm.measure.nplc = 1 -- fast",
+                                                "dmm.measure.range = 10",
+                                                "display.settext(display.TEXT1, \"a--b\")",
+                                                "-- whole line comment",
+                                                "dmm.measure.count = 5"])
+    assert instr.log[0] == ("write", "dmm.measure.nplc = 1 dmm.measure.range = 10 "
+                                     "display.settext(display.TEXT1, \"a--b\") dmm.measure.count = 5")
+
+
+def test_undefined_variable_reports_line():
+    with pytest.raises(CommandFileError, match="line 2"):
+        CommandFileRunner(FakeInstr()).Run(["*RST", "VOLT ${missing}"])
+
+
+def test_tsp_print_inside_strings_is_not_a_query():
+    instr = FakeInstr()
+    result = CommandFileRunner(instr, Language.TSP).Run(["display.settext(display.TEXT1, \"print(x)\")",
+                                                         "s = [[print(x) -- not a comment]]",
+                                                         "print(dmm.measure.read())"])
+    assert instr.log[:2] == [("write", "display.settext(display.TEXT1, \"print(x)\") "
+                                       "s = [[print(x) -- not a comment]]"),
+                             ("query", "print(dmm.measure.read())")]
+    assert len(result.responses) == 1
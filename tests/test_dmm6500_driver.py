@@ -0,0 +1,127 @@
+import pytest
+
+from Keithley_DMM6500_VISA_Driver import DMM6500, ScanCheckpoint
+
+
+class FakeDMM:
+    # Serves defbuffer1 from a list of readings; failIndexes makes the printbuffer
+    # query starting at that index time out once. With lateReplies the timed-out
+    # answer arrives afterwards and is read by the next query unless cleared.
+    def __init__(self, readings, startTime="1000\t0.5"):
+        self.readings = readings
+        self.startTime = startTime
+        self.failIndexes = set()
+        self.lateReplies = False
+        self.outputQueue = []
+        self.log = []
+
+    def clear(self):
+        self.log.append("clear")
+        self.outputQueue = []
+
+    def query(self, cmd):
+        self.log.append(cmd)
+        self.outputQueue.append(self.Answer(cmd))
+        return self.outputQueue.pop(0)
+
+    def Answer(self, cmd):
+        if cmd == "print(defbuffer1.n)":
+            return "{}\n".format(len(self.readings))
+        if cmd.startswith("print(defbuffer1.seconds["):
+            return self.startTime + "\n"
+        if cmd.startswith("printbuffer("):
+            first, last = [int(x) for x in cmd[12:].split(",")[:2]]
+            if first in self.failIndexes:
+                self.failIndexes.discard(first)
+                if self.lateReplies:
+                    self.outputQueue.append(", ".join(self.readings[first - 1:last]) + "\n")
+                raise TimeoutError("VI_ERROR_TMO")
+            return ", ".join(self.readings[first - 1:last]) + "\n"
+        if cmd == "*IDN?":
+            return "KEITHLEY INSTRUMENTS,MODEL DMM6500\n"
+        raise TimeoutError("VI_ERROR_TMO")
+
+
+def MakeDMM(instr):
+    dmm = DMM6500()
+    dmm.echoCmd = 0
+    dmm.myInstr = instr
+    dmm.retryDelay = 0
+    dmm.queryRetries = 0
+    dmm.scanChunkSize = 10
+    return dmm
+
+
+def test_download_resumes_from_last_confirmed_chunk():
+    instr = FakeDMM([str(i) for i in range(1, 26)])
+    instr.failIndexes = {11}
+    dmm = MakeDMM(instr)
+    with pytest.raises(TimeoutError):
+        dmm.GetScan_Data(25, 1, 25)
+    assert dmm.scanCheckpoint.NextIndex() == 11
+
+    data = dmm.GetScan_Data(25, 1, 25)
+    assert data == ", ".join(str(i) for i in range(1, 26))
+    printbuffers = [c for c in instr.log if c.startswith("printbuffer")]
+    assert printbuffers == ["printbuffer(1, 10, defbuffer1)", "printbuffer(11, 20, defbuffer1)",
+                            "printbuffer(11, 20, defbuffer1)", "printbuffer(21, 25, defbuffer1)"]
+    assert dmm.scanCheckpoint is None
+
+
+def test_late_reply_after_timeout_does_not_break_resume():
+    instr = FakeDMM([str(i) for i in range(1, 26)])
+    instr.failIndexes = {11}
+    instr.lateReplies = True
+    dmm = MakeDMM(instr)
+    with pytest.raises(TimeoutError):
+        dmm.GetScan_Data(25, 1, 25)
+    assert instr.outputQueue == []      # The late chunk was flushed by a device clear
+
+    assert dmm.GetScan_Data(25, 1, 25) == ", ".join(str(i) for i in range(1, 26))
+
+
+def test_next_scan_over_same_range_is_downloaded_again(tmp_path):
+    chk = str(tmp_path / "scan.json")
+    instr = FakeDMM(["1.0"] * 5)
+    dmm = MakeDMM(instr)
+    assert dmm.GetScan_Data(5, 1, 5, chk) == ", ".join(["1.0"] * 5)
+    assert not (tmp_path / "scan.json").exists()
+
+    instr.readings = ["2.0"] * 5
+    instr.startTime = "2000\t0.25"
+    assert dmm.GetScan_Data(5, 1, 5, chk) == ", ".join(["2.0"] * 5)
+
+
+def test_checkpoint_file_survives_restart_only_for_the_same_scan(tmp_path):
+    chk = str(tmp_path / "scan.json")
+    instr = FakeDMM([str(i) for i in range(1, 26)])
+    instr.failIndexes = {21}
+    with pytest.raises(TimeoutError):
+        MakeDMM(instr).GetScan_Data(25, 1, 25, chk)
+
+    # A new process resumes the same acquisition from the file
+    instr.log = []
+    assert MakeDMM(instr).GetScan_Data(25, 1, 25, chk).endswith("24, 25")
+    assert [c for c in instr.log if c.startswith("printbuffer")] == ["printbuffer(21, 25, defbuffer1)"]
+
+    # A leftover file from another acquisition is ignored
+    stale = ScanCheckpoint(1, 25, "999\t0", chk)
+    stale.Add(1, 10, "stale")
+    instr.log = []
+    assert "stale" not in MakeDMM(instr).GetScan_Data(25, 1, 25, chk)
+    assert len([c for c in instr.log if c.startswith("printbuffer")]) == 3
+
+
+def test_only_read_only_queries_are_retried():
+    instr = FakeDMM([])
+    dmm = MakeDMM(instr)
+    dmm.queryRetries = 2
+    with pytest.raises(TimeoutError):
+        dmm.QueryCmd("print(myfunction())")
+    assert instr.log == ["print(myfunction())", "clear"]
+
+    instr.log = []
+    with pytest.raises(TimeoutError):
+        dmm.QueryCmd("print(trigger.model.state())", idempotent=True)
+    assert instr.log == ["print(trigger.model.state())", "clear"] * 3
+    assert dmm.IDQuery().startswith("KEITHLEY")
@@ -0,0 +1,97 @@
+import math
+import time
+
+import pytest
+
+from Sweep_Plan import SweepPlan, LinearSteps, LogSteps, ListSteps
+
+
+class SlowSupply:
+    # Output holds its old value for `latency` seconds after a write, then moves
+    # towards the setpoint with time constant `tau`
+    def __init__(self, latency, tau):
+        self.latency = latency
+        self.tau = tau
+        self.state = {}     # channel -> (write time, old value, setpoint)
+
+    def apply(self, channel, value):
+        self.state[channel] = (time.perf_counter(), self.measure(channel) if channel in self.state else 0.0, value)
+
+    def measure(self, channel):
+        t0, old, new = self.state[channel]
+        t = time.perf_counter() - t0 - self.latency
+        if t <= 0:
+            return old
+        return new + (old - new) * math.exp(-t / self.tau)
+
+
+def test_linear_steps_are_exact_and_inclusive():
+    assert LinearSteps(0, 4.5, 10) == (0.0, 0.45, 0.9, 1.35, 1.8, 2.25, 2.7, 3.15, 3.6, 4.05, 4.5)
+    points = LinearSteps(0, 1, 1000)
+    assert len(points) == len(set(points)) == 1001
+    assert points[-1] == 1
+
+
+def test_log_and_list_steps():
+    assert LogSteps(1, 1000, 3, 0.001) == (1.0, 10.0, 100.0, 1000.0)
+    assert ListSteps([3, 1, 2]) == (3, 1, 2)
+    with pytest.raises(ValueError):
+        LinearSteps(0, 0.001, 10)       # Coarser than the default 1 mV resolution
+    with pytest.raises(ValueError):
+        LogSteps(0, 1, 3)
+
+
+def test_compile_nests_axes_and_writes_only_changes():
+    plan = SweepPlan().AddAxis("P25V", ListSteps([1, 2]), 1.0).AddAxis("P6V", LinearSteps(0, 1, 2), 0.1).Compile()
+    assert plan.points == ((1, 0.0), (1, 0.5), (1, 1.0), (2, 0.0), (2, 0.5), (2, 1.0))
+    assert plan.changes[0] == (("P25V", 1), ("P6V", 0.0))
+    assert plan.changes[1] == (("P6V", 0.5),)
+    assert plan.dwells == (1.0, 0.1, 0.1, 1.0, 0.1, 0.1)
+    assert plan.EstimateRuntime(cmdOverhead=0.01) == pytest.approx(2.48)
+
+
+def test_run_applies_every_step_in_order():
+    plan = SweepPlan().AddAxis("P6V", LinearSteps(0, 1, 2), 0).Compile()
+    writes = []
+    results = plan.Run(lambda ch, v: writes.append((ch, v)))
+    assert writes == [("P6V", 0.0), ("P6V", 0.5), ("P6V", 1.0)]
+    assert [r[0] for r in results] == list(plan.points)
+
+
+def test_settling_waits_for_the_setpoint_not_for_still_readings():
+    # 0 -> 4.5 V: still reads 0 V during the latency, then creeps up slowly
+    plan = SweepPlan().AddAxis("P6V", ListSteps([0.0, 4.5]), 0.5).Compile()
+    supply = SlowSupply(latency=0.02, tau=0.02)
+    supply.state["P6V"] = (0.0, 0.0, 0.0)
+    results = plan.Run(supply.apply, supply.measure, tolerance=0.05, pollInterval=0.001)
+    assert plan.unsettled == []
+    # Reaching 0.05 V of 4.5 V takes latency + tau * ln(4.5 / 0.05) = 110 ms
+    assert plan.settleTimes[1] >= 0.02 + 0.02 * math.log(4.5 / 0.05)
+    assert results[1][1][0] == pytest.approx(4.5, abs=0.05)
+
+
+def test_multi_channel_step_waits_for_every_changed_channel():
+    plan = SweepPlan().AddAxis("P25V", ListSteps([5.0]), 0.5).AddAxis("P6V", ListSteps([1.0]), 0.5).Compile()
+    fast = SlowSupply(latency=0.0, tau=0.001)
+    slow = SlowSupply(latency=0.03, tau=0.001)
+    supplies = {"P25V": slow, "P6V": fast}
+    plan.Run(lambda ch, v: supplies[ch].apply(ch, v), lambda ch: supplies[ch].measure(ch),
+             tolerance=0.01, pollInterval=0.001)
+    assert plan.settleTimes[0] >= 0.03
+
+
+def test_settling_does_not_shorten_the_plan_for_the_next_dut():
+    plan = SweepPlan().AddAxis("P6V", ListSteps([1, 2]), 0.5).Compile()
+
+    fast = SlowSupply(latency=0.0, tau=0.001)
+    plan.Run(fast.apply, fast.measure, tolerance=0.01, pollInterval=0.001)
+    assert plan.unsettled == []
+    schedule = plan.ScheduleDwells()
+    assert all(d < 0.5 for d in schedule)
+    assert plan.dwells == (0.5, 0.5)        # Base dwells are untouched
+
+    # A slow DUT is measured against its own settle timeout, not the fast DUT's schedule
+    slow = SlowSupply(latency=1.0, tau=0.001)
+    plan.Run(slow.apply, slow.measure, tolerance=0.01, settleTimeout=0.01, pollInterval=0.001)
+    assert plan.unsettled == [0, 1]
+    assert plan.ScheduleDwells() == (0.5, 0.5)
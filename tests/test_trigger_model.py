@@ -0,0 +1,73 @@
+import pytest
+
+from Keithley_DMM6500_Trigger_Model import TriggerModel, TriggerModelError, DigioEvent, NotifyEvent
+from Keithley_DMM6500_VISA_Driver import DMM6500
+
+
+def BuildTimedModel():
+    tm = TriggerModel()
+    tick = tm.Timer(1, 0.001, NotifyEvent(2), count=100)
+    tm.BufferClear()
+    tm.Wait(DigioEvent(1), clear=True)
+    tm.Notify(2)
+    tm.Label("loop")
+    tm.Wait(tick)
+    tm.Measure("defbuffer1", 1)
+    tm.BranchCounter(100, "loop")
+    return tm
+
+
+def test_compile_resolves_labels_to_block_numbers():
+    cmds = BuildTimedModel().Compile()
+    assert cmds[0] == "trigger.model.load(\"Empty\")"
+    assert "trigger.timer[1].start.stimulus = trigger.EVENT_NOTIFY2" in cmds
+    assert cmds[-4:] == [
+        "trigger.model.setblock(3, trigger.BLOCK_NOTIFY, trigger.EVENT_NOTIFY2)",
+        "trigger.model.setblock(4, trigger.BLOCK_WAIT, trigger.EVENT_TIMER1, trigger.CLEAR_NEVER, trigger.WAIT_AND)",
+        "trigger.model.setblock(5, trigger.BLOCK_MEASURE_DIGITIZE, defbuffer1, 1)",
+        "trigger.model.setblock(6, trigger.BLOCK_BRANCH_COUNTER, 100, 4)"]
+
+
+def test_forward_branch_and_bad_targets():
+    tm = TriggerModel()
+    tm.BranchOnEvent(DigioEvent(1), "done")
+    tm.Measure()
+    tm.Label("done")
+    tm.Notify(1)
+    assert tm.Compile()[-3] == "trigger.model.setblock(1, trigger.BLOCK_BRANCH_ON_EVENT, trigger.EVENT_DIGIO1, 3)"
+
+    tm.BranchAlways("missing")
+    with pytest.raises(TriggerModelError, match="unknown label"):
+        tm.Compile()
+    tm = TriggerModel()
+    tm.BranchAlways(7)
+    with pytest.raises(TriggerModelError, match="missing block 7"):
+        tm.Compile()
+
+
+def test_timer_needs_a_start_stimulus():
+    with pytest.raises(TriggerModelError):
+        TriggerModel().Timer(1, 0.001, None)
+    with pytest.raises(TriggerModelError):
+        TriggerModel().Timer(1, 0.001, "trigger.EVENT_NONE")
+
+
+def test_set_trigger_model_sends_few_messages():
+    class Writer:
+        def __init__(self):
+            self.msgs = []
+
+        def write(self, msg):
+            self.msgs.append(msg)
+
+    dmm = DMM6500()
+    dmm.echoCmd = 0
+    dmm.myInstr = Writer()
+    tm = BuildTimedModel()
+    dmm.SetTrigger_Model(tm)
+    assert dmm.myInstr.msgs == [" ".join(tm.Compile())]
+
+    dmm.myInstr = Writer()
+    dmm.SetTrigger_Model(tm, maxLen=200)
+    assert all(len(m) <= 200 for m in dmm.myInstr.msgs)
+    assert " ".join(dmm.myInstr.msgs) == " ".join(tm.Compile())